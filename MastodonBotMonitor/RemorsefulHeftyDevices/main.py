@@ -1,14 +1,27 @@
 import discord
 from discord.ext import commands
 import asyncio
+import functools
+import ijson
 import json
 import logging
 import os
-import pytz
+import signal
+import sqlite3
+import orjson
 from datetime import datetime
+from zoneinfo import ZoneInfo
+import aiofiles
 import aiohttp
+import yarl
 from winrate_checker import WinrateChecker
 
+try:
+    import uvloop  # not available on Windows
+    uvloop.install()
+except ImportError:
+    pass
+
 # -------------------- Configuration --------------------
 class Config:
     API_URL = "[redacted]"
@@ -17,21 +30,32 @@ class Config:
         "duration": "1m",
         "sort_field": "creation_timestamp",
         "sort_order": "desc",
-        "filter": json.dumps({
+        "filter": orjson.dumps({
             "liquidity": [50000, 1000000],
             "mkt_cap": [200000, 1000000],
             "holders": [400, 1e+308],
             "volume": [80000, 1e+308],
-        }),
+        }).decode(),
         "is_hide_honeypot": "true",
     }
+    # Query string is encoded once here rather than on every poll
+    API_URL_FULL = yarl.URL(API_URL).with_query(PARAMS)
 
     DISCORD_BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN", "[redacted]")
     CHANNEL_ID = int(os.getenv("CHANNEL_ID", [redacted]))
-    MOROCCO_TZ = pytz.timezone("Africa/Casablanca")
+    MOROCCO_TZ = ZoneInfo("Africa/Casablanca")
     CHECK_INTERVAL = 15  # seconds
-    REQUIRED_SUFFIX = "pump"  # New required suffix
-    BANNED_SUFFIX = "moon"    # Existing banned suffix
+    MAX_CHECK_INTERVAL = 60  # seconds, backoff cap when the API has nothing new
+    ERROR_RETRY_INTERVAL = 30  # seconds, minimum pause after a loop error
+    HTTP_TIMEOUT = 15  # seconds
+    MAX_INFLIGHT_ALERTS = 10  # alerts sent to Discord concurrently
+    SUBSCRIBERS_FLUSH_DELAY = 5  # seconds to batch subscription changes
+    STATE_DB = "state.db"
+    REQUIRED_SUFFIX = "pump"  # Only addresses ending with this are alerted
+
+# Suffix filter compared as a fixed-length slice on every poll
+_REQUIRED_SUFFIX = Config.REQUIRED_SUFFIX
+_REQUIRED_SUFFIX_START = -len(_REQUIRED_SUFFIX)
 
 # -------------------- Logging Setup --------------------
 logging.basicConfig(
@@ -40,11 +64,67 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# -------------------- Alert Embed --------------------
+# (field name, token_data key, value format, inline)
+_FIELD_SPECS = (
+    ("✨ Symbol", "symbol", "{}", True),
+    ("🔗 Address", "address", "`{}`", False),
+    ("📊 Market Cap", "fdv", "${:,.2f}", True),
+    ("💰 Price", "price", "${:.4f}", True),
+    ("💸 24h Volume", "volume", "${:,.0f}", True),
+    ("👥 Holders", "holders", "{:,}", True),
+    ("🏦 Liquidity", "liquidity", "${:,.0f}", True),
+    ("⏰ Detected", "created_ago", "{}", True),
+)
+
+# Static part of the alert embed; send_alert only fills in the per-token values
+_EMBED_TEMPLATE = {
+    "title": "🚀 **MASTODON SCAN ALERT** 🚀",
+    "color": 0x2ecc71,  # discord.Color.green()
+    "description": "Potential runner detected!",
+    "fields": [{"name": name, "value": None, "inline": inline} for name, _, _, inline in _FIELD_SPECS],
+}
+
 # -------------------- Token Monitor --------------------
 class TokenMonitor:
     def __init__(self):
-        self.seen_addresses = self.load_persistence("seen_addresses.json")
+        self.db = self.open_state_db(Config.STATE_DB)
+        self.import_legacy_seen()
         self.subscribed_users = self.load_persistence("subscribed_users.json")
+        self._subscribers_dirty = asyncio.Event()
+        # Created in on_ready, the session needs a running event loop
+        self.session = None
+        self.winrate_checker = None
+        # Resolved lazily by send_alert, once the client cache is populated
+        self.channel = None
+        self._empty_streak = 0
+        # Alerts are sent in the background; keep references until they finish
+        self._alert_tasks = set()
+        self._pending_alerts = set()
+        self._alert_slots = asyncio.Semaphore(Config.MAX_INFLIGHT_ALERTS)
+
+    def start_session(self):
+        """Create the shared HTTP session used for every API call"""
+        # One connector for every host, so DNS results and keep-alive sockets are shared
+        connector = aiohttp.TCPConnector(
+            limit=64,
+            limit_per_host=16,
+            keepalive_timeout=120,
+            use_dns_cache=True,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=Config.HTTP_TIMEOUT),
+            json_serialize=lambda obj: orjson.dumps(obj).decode(),
+        )
+        self.winrate_checker = WinrateChecker(self.session)
+
+    async def close_session(self):
+        """Close the shared HTTP session"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
 
     @staticmethod
     def load_persistence(filename):
@@ -60,34 +140,100 @@ class TokenMonitor:
         with open(filename, "w") as f:
             json.dump(list(data), f)
 
-    async def fetch_token_data(self):
-        """Fetch and validate token data from API"""
+    def mark_subscribers_dirty(self):
+        """Schedule subscribed_users to be written by the flusher"""
+        self._subscribers_dirty.set()
+
+    async def subscribers_flusher(self):
+        """Write subscribed_users to disk at most once per flush delay"""
+        while True:
+            await self._subscribers_dirty.wait()
+            await asyncio.sleep(Config.SUBSCRIBERS_FLUSH_DELAY)
+            # Cleared before writing so changes made meanwhile trigger another flush
+            self._subscribers_dirty.clear()
+            try:
+                async with aiofiles.open("subscribed_users.json", "w") as f:
+                    await f.write(json.dumps(list(self.subscribed_users)))
+            except OSError as e:
+                logger.error("Failed to save subscribed users: %s", e)
+
+    @staticmethod
+    def load_seen_log(filename):
+        """Load seen addresses from the append-only log (one per line)"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(Config.API_URL, params=Config.PARAMS) as resp:
-                    if resp.status != 200:
-                        logger.warning(f"API responded with status {resp.status}")
-                        return None
+            with open(filename, "r") as f:
+                return [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
 
-                    data = await resp.json()
-                    if not data.get("data") or len(data["data"]) == 0:
-                        return None
+    @staticmethod
+    def open_state_db(filename):
+        """Open the SQLite state database in autocommit WAL mode"""
+        db = sqlite3.connect(filename, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        # WAL only needs to fsync at checkpoints, so each insert stays off the disk
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS seen(address TEXT PRIMARY KEY)")
+        return db
+
+    def import_legacy_seen(self):
+        """Import addresses from the older JSON snapshot and log into an empty database"""
+        if self.db.execute("SELECT 1 FROM seen LIMIT 1").fetchone() is not None:
+            return
+
+        self.db.execute("BEGIN")
+        try:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO seen(address) VALUES (?)",
+                ((address,) for address in [
+                    *self.load_persistence("seen_addresses.json"),
+                    *self.load_seen_log("seen_addresses.log"),
+                ]),
+            )
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def is_seen(self, address):
+        """Check whether an address has already been processed"""
+        return self.db.execute(
+            "SELECT 1 FROM seen WHERE address = ?", (address,)
+        ).fetchone() is not None
+
+    def mark_seen(self, address):
+        """Record an address as processed"""
+        self.db.execute("INSERT OR IGNORE INTO seen(address) VALUES (?)", (address,))
 
-                    token = data["data"][0]
-                    return self.parse_token_data(token)
+    async def fetch_token_data(self):
+        """Fetch and validate token data from API"""
+        try:
+            async with self.session.get(Config.API_URL_FULL) as resp:
+                if resp.status != 200:
+                    logger.warning("API responded with status %s", resp.status)
+                    return None
+
+                # Stream the body and stop decoding at the first token
+                token = None
+                async for token in ijson.items(resp.content, "data.item", use_float=True):
+                    break
+                # Drain the rest unparsed, chunk by chunk, so the keep-alive connection can be reused
+                while await resp.content.readany():
+                    pass
+                return self.parse_token_data(token) if token is not None else None
 
         except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            logger.error(f"Network error: {e}")
+            logger.error("Network error: %s", e)
         except Exception as e:
-            logger.error(f"Unexpected error: {e}")
+            logger.error("Unexpected error: %s", e)
         return None
 
     def parse_token_data(self, token):
         """Extract and format token data with validation"""
         try:
             created_at = datetime.fromtimestamp(
-                token["creation_timestamp"], tz=pytz.utc
-            ).astimezone(Config.MOROCCO_TZ)
+                token["creation_timestamp"], tz=Config.MOROCCO_TZ
+            )
 
             return {
                 "address": token["address"],
@@ -98,126 +244,186 @@ class TokenMonitor:
                 "liquidity": token["pair_summary_info"]["liquidity"],
                 "volume": token["market_info"]["volume"],
                 "created_ago": created_at.strftime("%H:%M:%S"),
+                "created_at": created_at,
                 "logo": token["logo"]
             }
         except KeyError as e:
-            logger.error(f"Missing key in token data: {e}")
+            logger.error("Missing key in token data: %s", e)
             return None
 
+    async def resolve_channel(self):
+        """Look up the alert channel once and cache it if it is a text channel"""
+        try:
+            channel = client.get_channel(Config.CHANNEL_ID)
+            if channel is None:
+                channel = await client.fetch_channel(Config.CHANNEL_ID)
+        except discord.DiscordException as e:
+            logger.error("Discord API error: %s", e)
+            return
+        except (OSError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error("Network error resolving channel: %s", e)
+            return
+
+        # Ensure the channel is a TextChannel
+        if isinstance(channel, discord.TextChannel):
+            self.channel = channel
+        else:
+            logger.warning("Channel with ID %s is not a text channel. Cannot send message.", Config.CHANNEL_ID)
+
     async def send_alert(self, token_data):
         """Send formatted alert to Discord channel"""
+        if self.channel is None:
+            # The lookup in on_ready may have failed, so try again before giving up
+            await self.resolve_channel()
+        if self.channel is None:
+            logger.warning("Alert channel %s is unavailable. Cannot send message.", Config.CHANNEL_ID)
+            return False
+
         try:
-            channel = await client.fetch_channel(Config.CHANNEL_ID)
-
-            # Ensure the channel is a TextChannel
-            if isinstance(channel, discord.TextChannel):
-                embed = discord.Embed(
-                    title="🚀 **MASTODON SCAN ALERT** 🚀",
-                    color=discord.Color.green(),
-                    description="Potential runner detected!",
-                    timestamp=datetime.now(Config.MOROCCO_TZ)
-                )
-
-                # Validate token logo URL before setting it
-                logo_url = token_data.get('logo', '')
-                if logo_url.startswith("http://") or logo_url.startswith("https://"):
-                    embed.set_thumbnail(url=logo_url)
-                else:
-                    logger.warning(f"Invalid or missing logo URL: {logo_url}")
-
-                fields = [
-                    ("✨ Symbol", token_data['symbol'], True),
-                    ("🔗 Address", f"`{token_data['address']}`", False),
-                    ("📊 Market Cap", f"${token_data['fdv']:,.2f}", True),
-                    ("💰 Price", f"${token_data['price']:.4f}", True),
-                    ("💸 24h Volume", f"${token_data['volume']:,.0f}", True),
-                    ("👥 Holders", f"{token_data['holders']:,}", True),
-                    ("🏦 Liquidity", f"${token_data['liquidity']:,.0f}", True),
-                    ("⏰ Detected", token_data['created_ago'], True)
-                ]
-
-                for name, value, inline in fields:
-                    embed.add_field(name=name, value=value, inline=inline)
-
-                await channel.send(embed=embed)
-                return True
+            payload = {
+                **_EMBED_TEMPLATE,
+                "timestamp": token_data["created_at"].isoformat(),
+                "fields": [
+                    {**field, "value": fmt.format(token_data[key])}
+                    for field, (_, key, fmt, _) in zip(_EMBED_TEMPLATE["fields"], _FIELD_SPECS)
+                ],
+            }
+
+            # Validate token logo URL before setting it
+            logo_url = token_data.get('logo', '')
+            if logo_url.startswith("http://") or logo_url.startswith("https://"):
+                payload["thumbnail"] = {"url": logo_url}
             else:
-                logger.warning(f"Channel with ID {Config.CHANNEL_ID} is not a text channel. Cannot send message.")
-                return False
+                logger.warning("Invalid or missing logo URL: %s", logo_url)
+
+            await self.channel.send(embed=discord.Embed.from_dict(payload))
+            return True
 
         except discord.DiscordException as e:
-            logger.error(f"Discord API error: {e}")
+            logger.error("Discord API error: %s", e)
             return False
 
 
+    async def send_alert_bounded(self, token_data):
+        """Send an alert while holding one of the in-flight alert slots"""
+        async with self._alert_slots:
+            return await self.send_alert(token_data)
+
+    def schedule_alert(self, token_data):
+        """Send an alert in the background so polling is not held up"""
+        self._pending_alerts.add(token_data["address"])
+        task = asyncio.create_task(self.send_alert_bounded(token_data))
+        self._alert_tasks.add(task)
+        task.add_done_callback(functools.partial(self._on_alert_done, token_data))
+
+    def _on_alert_done(self, token_data, task):
+        """Track the address once its alert has been delivered"""
+        self._alert_tasks.discard(task)
+        self._pending_alerts.discard(token_data["address"])
+        if task.cancelled():
+            return
+        if e := task.exception():
+            logger.error("Alert task error: %s", e, exc_info=e)
+            return
+        if task.result():
+            self.mark_seen(token_data["address"])
+            logger.info("New pump alert sent for %s", token_data['symbol'])
+
+    def next_delay(self, new_data):
+        """Return the pause before the next poll, doubling on consecutive empty polls"""
+        if new_data:
+            self._empty_streak = 0
+            return Config.CHECK_INTERVAL
+
+        delay = min(Config.CHECK_INTERVAL * (2 ** self._empty_streak), Config.MAX_CHECK_INTERVAL)
+        if delay < Config.MAX_CHECK_INTERVAL:
+            self._empty_streak += 1
+        return delay
+
     async def monitoring_loop(self):
-        """Continuous monitoring with dual filters"""
+        """Continuous monitoring with suffix filter"""
         while True:
             try:
                 # Fetch token data
                 if token_data := await self.fetch_token_data():
                     address = token_data["address"]
 
-                    # Check if address has been processed already (skipped or alerted)
-                    if address in self.seen_addresses:
-                        logger.info(f"Skipping already processed address: {address}")
-                        continue  # Skip if the address has already been processed
+                    # Check if address has been processed already (skipped, alerted or alert in flight)
+                    if self.is_seen(address) or address in self._pending_alerts:
+                        logger.info("Skipping already processed address: %s", address)
+                        token_data = None  # Nothing new on this poll
 
                     # Check for non-pump tokens (check if address does not end with required suffix)
-                    if not address.endswith(Config.REQUIRED_SUFFIX):
-                        logger.info(f"Skipping non-pump token: {address}")
-                        # Mark the address as processed and continue to the next token
-                        self.seen_addresses.add(address)
-                        self.save_persistence(self.seen_addresses, "seen_addresses.json")
-                        continue  # Stop checking and move to the next token
-
-                    # Check for banned tokens (if address ends with 'moon')
-                    if address.endswith(Config.BANNED_SUFFIX):
-                        logger.info(f"Skipping moon token: {address}")
-                        # Mark the address as processed and continue to the next token
-                        self.seen_addresses.add(address)
-                        self.save_persistence(self.seen_addresses, "seen_addresses.json")
-                        continue  # Stop checking and move to the next token
-
-                    # If the address passes the checks, send the alert and track it
-                    if await self.send_alert(token_data):
-                        self.seen_addresses.add(address)
-                        self.save_persistence(self.seen_addresses, "seen_addresses.json")
-                        logger.info(f"New pump alert sent for {token_data['symbol']}")
-
-                # Pause the loop for the set interval before checking again
-                await asyncio.sleep(Config.CHECK_INTERVAL)
+                    elif address[_REQUIRED_SUFFIX_START:] != _REQUIRED_SUFFIX:
+                        logger.info("Skipping non-pump token: %s", address)
+                        # Mark the address as processed so it is not checked again
+                        self.mark_seen(address)
+
+                    # If the address passes the checks, send the alert and track it once delivered
+                    else:
+                        self.schedule_alert(token_data)
+
+                # Pause the loop, backing off while the API has nothing new
+                await asyncio.sleep(self.next_delay(new_data=token_data is not None))
 
             except Exception as e:
-                logger.error(f"Monitoring loop error: {e}")
-                await asyncio.sleep(30)
+                logger.error("Monitoring loop error: %s", e)
+                await asyncio.sleep(max(self.next_delay(new_data=False), Config.ERROR_RETRY_INTERVAL))
 
 
 
 
 # -------------------- Bot Setup --------------------
+class MonitorBot(commands.Bot):
+    async def setup_hook(self):
+        """Close the bot cleanly on SIGTERM, which client.run does not handle"""
+        try:
+            self.loop.add_signal_handler(signal.SIGTERM, self._on_sigterm)
+        except NotImplementedError:
+            pass  # not supported by the Windows event loop
+
+    def _on_sigterm(self):
+        logger.info("Received SIGTERM")
+        self._close_task = asyncio.create_task(self.close())
+
+    async def close(self):
+        """Stop polling, then close the bot and the shared HTTP session"""
+        if monitor_task := getattr(self, "monitor_task", None):
+            monitor_task.cancel()
+        if subscribers_task := getattr(self, "subscribers_task", None):
+            subscribers_task.cancel()
+        # Final save covers changes the background flusher has not written yet
+        monitor.save_persistence(monitor.subscribed_users, "subscribed_users.json")
+        await super().close()
+        await monitor.close_session()
+
+
 intents = discord.Intents.default()
-client = commands.Bot(command_prefix="!", intents=intents)
+client = MonitorBot(command_prefix="!", intents=intents)
 monitor = TokenMonitor()
 
 @client.event
 async def on_ready():
-    logger.info(f"Logged in as {client.user}")
+    logger.info("Logged in as %s", client.user)
+    if monitor.session is None:
+        monitor.start_session()
     if not hasattr(client, "monitor_task"):
         client.monitor_task = client.loop.create_task(monitor.monitoring_loop())
+    if not hasattr(client, "subscribers_task"):
+        client.subscribers_task = client.loop.create_task(monitor.subscribers_flusher())
 
 @client.command()
 async def subscribe(ctx):
     """Subscribe to MASTODON alerts"""
     monitor.subscribed_users.add(ctx.author.id)
-    monitor.save_persistence(monitor.subscribed_users, "subscribed_users.json")
+    monitor.mark_subscribers_dirty()
     await ctx.send("✅ You've been subscribed to PUMP alerts!")
 
 @client.command()
 async def unsubscribe(ctx):
     """Unsubscribe from pump alerts"""
     monitor.subscribed_users.discard(ctx.author.id)
-    monitor.save_persistence(monitor.subscribed_users, "subscribed_users.json")
+    monitor.mark_subscribers_dirty()
     await ctx.send("❌ You've been unsubscribed from PUMP alerts.")
 
 @client.event
@@ -225,16 +431,13 @@ async def on_command_error(ctx, error):
     """Handle command errors"""
     if isinstance(error, commands.CommandNotFound):
         return
-    logger.error(f"Command error: {error}")
+    logger.error("Command error: %s", error)
     await ctx.send(f"⚠️ Error: {str(error)}")
 
 
 # -------------------- Main Execution --------------------
 if __name__ == "__main__":
-    try:
-        client.run(Config.DISCORD_BOT_TOKEN)
-    except KeyboardInterrupt:
-        logger.info("Shutting down bot...")
-        client.loop.run_until_complete(client.close())
-        monitor.save_persistence(monitor.seen_addresses, "seen_addresses.json")
-        monitor.save_persistence(monitor.subscribed_users, "subscribed_users.json")
+    # client.run returns once MonitorBot.close has run, on Ctrl+C or SIGTERM
+    client.run(Config.DISCORD_BOT_TOKEN)
+    logger.info("Shutting down bot...")
+    monitor.db.close()
@@ -1,13 +1,17 @@
 import aiohttp
+import asyncio
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
 class WinrateChecker:
     BASE_URL = "[redacted]"
 
-    @staticmethod
-    async def fetch_holders(token_address, holders_count=10):
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+
+    async def fetch_holders(self, token_address, holders_count=10):
         """Fetch top holders of a token."""
         url = f"{WinrateChecker.BASE_URL}/token/profiler/tokenHolderList"
         params = {
@@ -18,21 +22,32 @@ class WinrateChecker:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as resp:
-                    if resp.status != 200:
-                        logger.error(f"Failed to fetch holders: {resp.status}")
-                        return None
+            async with self.session.get(url, params=params) as resp:
+                if resp.status != 200:
+                    logger.error("Failed to fetch holders: %s", resp.status)
+                    return None
+
+                data = orjson.loads(await resp.read())
+                payload = data.get("data") if isinstance(data, dict) else None
+                if not isinstance(payload, dict):
+                    logger.error("Unexpected holders response for %s", token_address)
+                    return None
+
+                holders = payload.get("list")
+                if not isinstance(holders, list):
+                    holders = []
 
-                    data = await resp.json()
-                    return [holder["wallet"] for holder in data.get("data", {}).get("list", [])[:holders_count]]
+                return [
+                    holder["wallet"]
+                    for holder in holders[:holders_count]
+                    if isinstance(holder, dict) and "wallet" in holder
+                ]
 
-        except Exception as e:
-            logger.error(f"Error fetching holders: {e}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error("Error fetching holders: %s", e)
             return None
 
-    @staticmethod
-    async def fetch_wallet_winrate(wallet_address):
+    async def fetch_wallet_winrate(self, wallet_address):
         """Fetch winrate for a specific wallet."""
         url = f"{WinrateChecker.BASE_URL}/dashboard/token/trading/stats"
         params = {
@@ -41,29 +56,39 @@ class WinrateChecker:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as resp:
-                    if resp.status != 200:
-                        logger.error(f"Failed to fetch winrate for {wallet_address}: {resp.status}")
-                        return None
+            async with self.session.get(url, params=params) as resp:
+                if resp.status != 200:
+                    logger.error("Failed to fetch winrate for %s: %s", wallet_address, resp.status)
+                    return None
 
-                    data = await resp.json()
-                    return data.get("data", {}).get("winrate_30d", "N/A")
+                data = orjson.loads(await resp.read())
+                payload = data.get("data") if isinstance(data, dict) else None
+                if not isinstance(payload, dict):
+                    logger.error("Unexpected winrate response for %s", wallet_address)
+                    return None
 
-        except Exception as e:
-            logger.error(f"Error fetching winrate for {wallet_address}: {e}")
+                return payload.get("winrate_30d", "N/A")
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error("Error fetching winrate for %s: %s", wallet_address, e)
             return None
 
-    @staticmethod
-    async def get_holders_with_winrates(token_address):
+    async def get_holders_with_winrates(self, token_address):
         """Retrieve top holders along with their individual winrates."""
-        holders = await WinrateChecker.fetch_holders(token_address)
+        holders = await self.fetch_holders(token_address)
         if not holders:
             return None
 
+        winrates = await asyncio.gather(
+            *(self.fetch_wallet_winrate(wallet) for wallet in holders),
+            return_exceptions=True,
+        )
+
         winrate_results = []
-        for wallet in holders:
-            winrate = await WinrateChecker.fetch_wallet_winrate(wallet)
+        for wallet, winrate in zip(holders, winrates):
+            if isinstance(winrate, BaseException):
+                logger.error("Error fetching winrate for %s: %s", wallet, winrate)
+                winrate = None
             winrate_results.append(f"{wallet} - {winrate}%")
 
         return winrate_results